@@ -11,28 +11,44 @@ Soporta:
 """
 
 import ast
+import collections
+import functools
+import itertools
 import operator as op
 import math
 from decimal import Decimal, getcontext, InvalidOperation
-import readline  # para historial/edición en terminal
 import sys
 
+try:
+    import numpy as np  # opcional: conversiones por lotes vectorizadas
+except ImportError:
+    np = None
+
+try:
+    import numexpr as ne  # opcional: expresiones elementales sobre arrays
+except ImportError:
+    ne = None
+
 # Ajuste de precisión decimal (puedes cambiar)
 getcontext().prec = 28
 
 # --- Operadores permitidos en AST ---
-ALLOWED_OPERATORS = {
+# binarios y unarios por separado: una sola búsqueda por nodo
+_BINOPS = {
     ast.Add: op.add,
     ast.Sub: op.sub,
     ast.Mult: op.mul,
     ast.Div: op.truediv,
     ast.Pow: op.pow,
     ast.Mod: op.mod,
+    ast.FloorDiv: op.floordiv,
+    # ast.BitXor (^) queda fuera a propósito (por seguridad / no estándar)
+}
+_UNARYOPS = {
     ast.USub: op.neg,
     ast.UAdd: op.pos,
-    ast.FloorDiv: op.floordiv,
-    ast.BitXor: None,  # deshabilitado (por seguridad / no estándar)
 }
+ALLOWED_OPERATORS = {**_BINOPS, **_UNARYOPS}
 
 # --- Funciones matemáticas expuestas ---
 MATH_FUNCS = {
@@ -48,7 +64,8 @@ MATH_FUNCS = {
     'tanh': math.tanh,
     'exp': math.exp,
     'ln': math.log,      # ln(x) -> log natural
-    'log': lambda x, b=10: math.log(x, b),  # log(x) o log(x, base)
+    'log': math.log10,   # log(x) -> base 10
+    'log_base': math.log,  # log_base(x, b)
     'sqrt': math.sqrt,
     'pow': math.pow,
     'abs': abs,
@@ -61,42 +78,65 @@ MATH_FUNCS = {
     'rad': math.radians,
 }
 
+# Nombres base disponibles en toda expresión (funciones y constantes)
+_BASE_NAMES = {**MATH_FUNCS, 'pi': math.pi, 'e': math.e}
+
 # --- Conversiones de unidades simples ---
+# Productos y sumas con functools.partial (sin frame de Python, sirven con arrays).
+# Las divisiones siguen como lambda: multiplicar por el inverso pierde exactitud
+# (2.54 * (1/2.54) != 1.0).
 CONVERSIONS = {
     'c_to_f': lambda c: (c * 9/5) + 32,
     'f_to_c': lambda f: (f - 32) * 5/9,
-    'c_to_k': lambda c: c + 273.15,
+    'c_to_k': functools.partial(op.add, 273.15),
     'k_to_c': lambda k: k - 273.15,
     # longitud (metros, centímetros, kilómetros, pulgadas, pies)
-    'm_to_cm': lambda m: m * 100,
+    'm_to_cm': functools.partial(op.mul, 100),
     'cm_to_m': lambda cm: cm / 100,
     'm_to_km': lambda m: m / 1000,
-    'km_to_m': lambda km: km * 1000,
-    'in_to_cm': lambda i: i * 2.54,
+    'km_to_m': functools.partial(op.mul, 1000),
+    'in_to_cm': functools.partial(op.mul, 2.54),
     'cm_to_in': lambda cm: cm / 2.54,
-    'ft_to_m': lambda ft: ft * 0.3048,
+    'ft_to_m': functools.partial(op.mul, 0.3048),
     'm_to_ft': lambda m: m / 0.3048,
     # masa
-    'kg_to_g': lambda kg: kg * 1000,
+    'kg_to_g': functools.partial(op.mul, 1000),
     'g_to_kg': lambda g: g / 1000,
-    'lb_to_kg': lambda lb: lb * 0.45359237,
+    'lb_to_kg': functools.partial(op.mul, 0.45359237),
     'kg_to_lb': lambda kg: kg / 0.45359237,
 }
 
+# CONVERSIONS no cambia tras importar: la lista ordenada se arma una sola vez
+_CONVERT_LIST_STR = ", ".join(sorted(CONVERSIONS.keys()))
+
 # --- Estado de la calculadora ---
-history = []
+HISTORY_MAX = 1000
+history = collections.deque(maxlen=HISTORY_MAX)  # descarta lo más antiguo
 memory = Decimal('0')
-variables = {}  # para asignaciones simples
+# Variables de usuario en dos dicts paralelos:
+#  - variables_float: valor listo para evaluar (float o ndarray), una entrada por variable
+#  - variables_decimal: valor exacto solo de las que se asignaron como Decimal (modo :precise)
+variables_float = {}
+variables_decimal = {}
+_array_vars = set()  # nombres cuyo valor es un ndarray (activa la ruta NumExpr)
+_last_result = None  # último resultado numérico (tal cual) para M+ / M-
+HIGH_PRECISION = False  # ':precise' -> devolver resultados como Decimal
 
 # --- Helpers: convertir a Decimal si es posible ---
+@functools.lru_cache(maxsize=1024)
+def _decimal_from_str(text):
+    # Decimal es inmutable, así que el resultado se puede compartir
+    return Decimal(text)
+
+
 def to_decimal(val):
+    if isinstance(val, Decimal):
+        return val
     try:
-        if isinstance(val, Decimal):
-            return val
         if isinstance(val, (int, float)):
-            return Decimal(str(val))
+            return _decimal_from_str(str(val))
         if isinstance(val, str):
-            return Decimal(val)
+            return _decimal_from_str(val)
     except InvalidOperation:
         raise ValueError(f"No se puede convertir '{val}' a Decimal.")
     raise ValueError(f"Tipo no soportado para conversión a Decimal: {type(val)}")
@@ -105,32 +145,32 @@ def to_decimal(val):
 # --- Evaluador AST seguro ---
 class Evaluator(ast.NodeVisitor):
     def __init__(self, names):
+        # names ya incluye funciones y constantes (ver _BASE_NAMES)
         self.names = names
 
     def visit(self, node):
-        if isinstance(node, ast.Expression):
-            return self.visit(node.body)
-        return super().visit(node)
+        # tabla tipo -> método en lugar del getattr('visit_' + nombre) de NodeVisitor
+        return _DISPATCH.get(type(node), Evaluator.generic_visit)(self, node)
+
+    def visit_Expression(self, node):
+        return self.visit(node.body)
 
     def visit_BinOp(self, node):
         left = self.visit(node.left)
         right = self.visit(node.right)
-        op_type = type(node.op)
-        if op_type in ALLOWED_OPERATORS and ALLOWED_OPERATORS[op_type] is not None:
-            func = ALLOWED_OPERATORS[op_type]
-            return func(left, right)
-        raise ValueError(f"Operador no permitido: {op_type}")
+        try:
+            func = _BINOPS[type(node.op)]
+        except KeyError:
+            raise ValueError(f"Operador no permitido: {type(node.op)}")
+        return func(left, right)
 
     def visit_UnaryOp(self, node):
         operand = self.visit(node.operand)
-        op_type = type(node.op)
-        if op_type in ALLOWED_OPERATORS and ALLOWED_OPERATORS[op_type] is not None:
-            func = ALLOWED_OPERATORS[op_type]
-            return func(operand)
-        raise ValueError(f"Operador unario no permitido: {op_type}")
-
-    def visit_Num(self, node):
-        return node.n
+        try:
+            func = _UNARYOPS[type(node.op)]
+        except KeyError:
+            raise ValueError(f"Operador unario no permitido: {type(node.op)}")
+        return func(operand)
 
     def visit_Constant(self, node):
         # ast.Constant cubre números y strings en Python3.8+
@@ -139,16 +179,10 @@ class Evaluator(ast.NodeVisitor):
         raise ValueError(f"Constante no soportada: {node.value}")
 
     def visit_Name(self, node):
-        if node.id in self.names:
+        try:
             return self.names[node.id]
-        if node.id in MATH_FUNCS:
-            return MATH_FUNCS[node.id]
-        # permitir constantes pi y e
-        if node.id == 'pi':
-            return math.pi
-        if node.id == 'e':
-            return math.e
-        raise ValueError(f"Nombre no definido: '{node.id}'")
+        except KeyError:
+            raise ValueError(f"Nombre no definido: '{node.id}'")
 
     def visit_Call(self, node):
         func = self.visit(node.func)
@@ -165,20 +199,229 @@ class Evaluator(ast.NodeVisitor):
         raise ValueError(f"Nodo no permitido en expresión: {type(node).__name__}")
 
 
+_DISPATCH = {
+    ast.Expression: Evaluator.visit_Expression,
+    ast.BinOp: Evaluator.visit_BinOp,
+    ast.UnaryOp: Evaluator.visit_UnaryOp,
+    ast.Constant: Evaluator.visit_Constant,
+    ast.Name: Evaluator.visit_Name,
+    ast.Call: Evaluator.visit_Call,
+    ast.Assign: Evaluator.visit_Assign,
+}
+
+
+# --- Validador: recorre el AST sin evaluar y recoge los nombres usados ---
+class _Validator(ast.NodeVisitor):
+    def __init__(self):
+        self.names_used = set()
+
+    def visit_Expression(self, node):
+        self.visit(node.body)
+
+    def visit_BinOp(self, node):
+        if type(node.op) not in _BINOPS:
+            raise ValueError(f"Operador no permitido: {type(node.op)}")
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_UnaryOp(self, node):
+        if type(node.op) not in _UNARYOPS:
+            raise ValueError(f"Operador unario no permitido: {type(node.op)}")
+        self.visit(node.operand)
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float, complex)):
+            raise ValueError(f"Constante no soportada: {node.value}")
+
+    def visit_Name(self, node):
+        self.names_used.add(node.id)
+
+    def visit_Call(self, node):
+        # solo llamadas directas a funciones de MATH_FUNCS, sin kwargs ni *args;
+        # el resto (p. ej. a(2) con 'a' variable) lo reporta el Evaluator
+        if (node.keywords or not isinstance(node.func, ast.Name)
+                or node.func.id not in MATH_FUNCS):
+            raise ValueError("Llamada no soportada")
+        self.visit(node.func)
+        for a in node.args:
+            self.visit(a)
+
+    def generic_visit(self, node):
+        raise ValueError(f"Nodo no permitido en expresión: {type(node).__name__}")
+
+
+# --- Plegado de constantes: evalúa una vez los subárboles puramente numéricos ---
+_FOLDABLE_NAMES = {'pi': math.pi, 'e': math.e}
+# límite de tamaño para plegar potencias enteras (como el optimizador de CPython):
+# 7**10**7 se deja para la evaluación en lugar de calcularlo al parsear
+_FOLD_MAX_BITS = 128
+# factorial crece sin límite práctico: nunca se pliega
+_NO_FOLD_FUNCS = frozenset({'fact', 'factorial'})
+
+
+def _const_value(node):
+    """Valor numérico de un nodo constante, o None si no lo es."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, complex)):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in _FOLDABLE_NAMES:
+        return _FOLDABLE_NAMES[node.id]
+    return None
+
+
+class _Folder(ast.NodeTransformer):
+    def _fold(self, node, compute):
+        # si el cálculo falla (1/0, dominio...) se deja el nodo para que falle al evaluar
+        try:
+            value = compute()
+        except Exception:
+            return node
+        if not isinstance(value, (int, float, complex)):
+            return node
+        return ast.copy_location(ast.Constant(value=value), node)
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        func = _BINOPS.get(type(node.op))
+        left = _const_value(node.left)
+        right = _const_value(node.right)
+        if func is None or left is None or right is None:
+            return node
+        if (func is op.pow and isinstance(left, int) and isinstance(right, int)
+                and right > 0 and left.bit_length() * right > _FOLD_MAX_BITS):
+            return node
+        return self._fold(node, lambda: func(left, right))
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        func = _UNARYOPS.get(type(node.op))
+        operand = _const_value(node.operand)
+        if func is None or operand is None:
+            return node
+        return self._fold(node, lambda: func(operand))
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if (node.keywords or not isinstance(node.func, ast.Name)
+                or node.func.id not in MATH_FUNCS or node.func.id in _NO_FOLD_FUNCS):
+            return node
+        args = [_const_value(a) for a in node.args]
+        if any(a is None for a in args):
+            return node
+        func = MATH_FUNCS[node.func.id]
+        return self._fold(node, lambda: func(*args))
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_cached(expr):
+    """
+    Parsea una sola vez por texto de entrada. Solo se pliegan constantes en
+    árboles que el validador acepta; el resto va intacto al Evaluator.
+    """
+    try:
+        tree = ast.parse(expr, mode='eval')
+    except SyntaxError:
+        raise ValueError("Sintaxis inválida")
+    if _validate(tree) is None:
+        return tree
+    return ast.fix_missing_locations(_Folder().visit(tree))
+
+
+def _validate(tree):
+    """Devuelve el conjunto de nombres usados, o None si el árbol no es válido."""
+    validator = _Validator()
+    try:
+        validator.visit(tree)
+    except ValueError:
+        return None
+    return validator.names_used
+
+
+# Globales restringidos para el bytecode: sin builtins, solo funciones y constantes
+_RESTRICTED_GLOBALS = {'__builtins__': {}, **_BASE_NAMES}
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_cached(expr):
+    """
+    Valida y compila la expresión a bytecode. Devuelve (code, nombres libres)
+    o (None, None) si la expresión debe pasar por el Evaluator.
+    Los nombres libres son los que no son funciones ni constantes (_BASE_NAMES);
+    '__builtins__' cuenta como libre para que no se resuelva por los globales.
+    """
+    tree = _parse_cached(expr)
+    names_used = _validate(tree)
+    if names_used is None:
+        return None, None
+    free = frozenset(n for n in names_used if n not in _BASE_NAMES)
+    return compile(tree, '<calc>', 'eval'), free
+
+
 def safe_eval(expr, names=None):
     """
     Evalúa una expresión aritmética/funcional de forma segura usando ast.
     """
     if names is None:
-        names = {}
-    try:
-        parsed = ast.parse(expr, mode='eval')
-    except SyntaxError as e:
-        raise ValueError("Sintaxis inválida")
+        names = _BASE_NAMES
+    parsed = _parse_cached(expr)
+    code, free = _compile_cached(expr)
+    # ruta rápida: árbol ya validado y todos los nombres conocidos
+    if code is not None and all(n in names for n in free):
+        return eval(code, _RESTRICTED_GLOBALS, names)
     evaluator = Evaluator(names)
     return evaluator.visit(parsed)
 
 
+# --- Ruta NumExpr: expresiones elementales cuando las variables son arrays ---
+_NUMEXPR_OPS = frozenset({ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd})
+# 'log' y 'ln' quedan fuera: en NumExpr 'log' es el logaritmo natural
+_NUMEXPR_FUNCS = frozenset({'sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh', 'exp', 'sqrt', 'abs'})
+
+
+def _is_numexpr_safe(tree):
+    """True si el árbol solo usa operadores y funciones que NumExpr entiende igual."""
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            if type(node.op) not in _NUMEXPR_OPS:
+                return False
+        elif isinstance(node, ast.Call):
+            if (node.keywords or not isinstance(node.func, ast.Name)
+                    or node.func.id not in _NUMEXPR_FUNCS):
+                return False
+        elif not isinstance(node, (ast.Expression, ast.Constant, ast.Name,
+                                   ast.Load, ast.operator, ast.unaryop)):
+            return False
+    return True
+
+
+@functools.lru_cache(maxsize=512)
+def _numexpr_names(expr):
+    """
+    Nombres (no funciones) que usa la expresión si NumExpr puede evaluarla,
+    o None si no es compatible. Se calcula una sola vez por texto.
+    """
+    tree = _parse_cached(expr)
+    if not _is_numexpr_safe(tree):
+        return None
+    return frozenset(node.id for node in ast.walk(tree)
+                     if isinstance(node, ast.Name) and node.id not in _NUMEXPR_FUNCS)
+
+
+def _numexpr_eval(expr, names):
+    """
+    Evalúa con numexpr si alguna variable usada es un ndarray y la expresión
+    es compatible. Devuelve None para seguir por la ruta normal.
+    """
+    used = _numexpr_names(expr)
+    if used is None or used.isdisjoint(_array_vars):
+        return None
+    local_dict = {}
+    for name in used:
+        if name not in names:
+            return None
+        local_dict[name] = names[name]
+    return ne.evaluate(expr, local_dict=local_dict, global_dict={})
+
+
 # --- Procesamiento de líneas: soporta 'a = expr' para asignar variables ---
 def process_line(line):
     line = line.strip()
@@ -186,32 +429,44 @@ def process_line(line):
         return None
 
     # Comandos especiales
-    if line.lower() in (':h', ':help', 'help', 'ayuda'):
-        return help_text()
-    if line.lower() in (':q', ':quit', 'exit', 'salir'):
-        print("Saliendo...")
-        sys.exit(0)
-    if line.lower() in (':history', 'history'):
-        return show_history()
-    if line.lower() in (':mem', 'memory'):
-        return f"Memoria = {memory}"
-    if line.lower() in (':mc',):
-        return clear_memory()
-    if line.lower().startswith(':convert'):
+    low = line.lower()
+    handler = _COMMANDS.get(low)
+    if handler is not None:
+        return handler()
+    if low.startswith(':convert'):
         # :convert tipo valor  -> ejemplo: :convert c_to_f 100
+        # :convert tipo v1, v2, ... -> conversión por lotes (lista)
         parts = line.split()
         if len(parts) < 3:
-            return ("Uso: :convert <tipo> <valor>. Tipos disponibles: " +
-                    ", ".join(sorted(CONVERSIONS.keys())))
+            return "Uso: :convert <tipo> <valor>. Tipos disponibles: " + _CONVERT_LIST_STR
         key = parts[1]
+        raw = parts[2:]
+        if ',' in line:
+            raw = " ".join(raw).replace(',', ' ').split()
+        if not raw:
+            return "Valor inválido para conversión."
         try:
-            val = float(parts[2])
+            if len(raw) == 1:
+                val = float(raw[0])
+            elif np is not None:
+                val = np.fromiter((float(p) for p in raw), dtype=np.float64)
+            else:
+                val = [float(p) for p in raw]
         except Exception:
             return "Valor inválido para conversión."
         if key not in CONVERSIONS:
             return f"Conversión desconocida: {key}"
-        res = CONVERSIONS[key](val)
+        conv = CONVERSIONS[key]
+        if isinstance(val, float):
+            res = conv(val)
+        elif np is not None:
+            # las lambdas solo usan + - * /, así que aceptan arrays directamente
+            res = conv(val).tolist()
+            val = val.tolist()
+        else:
+            res = [conv(v) for v in val]
         history.append(f"convert {key}({val}) => {res}")
+        _set_last_result(res)
         return res
 
     # Memoria: M+, M-, MR, MC (pueden venir solas o separadas)
@@ -224,10 +479,49 @@ def process_line(line):
         var = var_part.strip()
         if not var.isidentifier():
             return "Nombre de variable inválido."
-        val = evaluate_expression(expr_part.strip())
+        # funciones y constantes no se pueden redefinir (se pliegan al parsear)
+        if var in _BASE_NAMES:
+            return f"Nombre reservado: '{var}'"
+        expr_part = expr_part.strip()
+        if expr_part.startswith('[') and np is not None:
+            # a = [1, 2, 3] -> variable array (para la ruta NumExpr)
+            try:
+                items = ast.literal_eval(expr_part)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                return "Lista de valores inválida."
+            # solo números: np.array convertiría en silencio '1' o True
+            if not isinstance(items, list) or not all(
+                    isinstance(x, (int, float)) and not isinstance(x, bool) for x in items):
+                return "Lista de valores inválida."
+            try:
+                val = np.array(items, dtype=np.float64)
+            except OverflowError:
+                return "Lista de valores inválida."
+        else:
+            val = evaluate_expression(expr_part)
+        if np is not None and isinstance(val, np.ndarray):
+            variables_float[var] = val
+            variables_decimal.pop(var, None)
+            _array_vars.add(var)
+            history.append(f"{var} = {val}")
+            _clear_last_result()
+            return f"{var} = {val}"
         if isinstance(val, (int, float, Decimal)):
-            variables[var] = val
+            exact = val if isinstance(val, Decimal) else None
+            try:
+                variables_float[var] = float(val)
+            except OverflowError:
+                # entero demasiado grande para float: infinito al evaluar,
+                # valor exacto en variables_decimal
+                variables_float[var] = math.inf if val > 0 else -math.inf
+                exact = Decimal(val)
+            if exact is not None:
+                variables_decimal[var] = exact
+            else:
+                variables_decimal.pop(var, None)
+            _array_vars.discard(var)
             history.append(f"{var} = {val}")
+            _clear_last_result()
             return f"{var} = {val}"
         else:
             return "No se puede asignar ese tipo de valor a la variable."
@@ -236,39 +530,74 @@ def process_line(line):
     return evaluate_expression(line)
 
 
+def _single_token_value(expr):
+    """
+    Valor de una entrada de un solo token (variable, pi/e o número literal) sin
+    pasar por ast. Devuelve None si hay que evaluarla de forma normal; las
+    funciones sueltas (p. ej. 'sin') también siguen la ruta normal.
+    """
+    if expr.isidentifier():
+        if HIGH_PRECISION and expr in variables_decimal:
+            return variables_decimal[expr]
+        val = variables_float.get(expr)
+        if val is None:
+            val = _FOLDABLE_NAMES.get(expr)
+        return val
+    # solo literales ASCII que terminan en dígito o punto (evita 'inf', '-nan',
+    # '1j', dígitos no ASCII...). '007' tampoco es un literal válido en Python:
+    # cualquier 0 inicial seguido de otro dígito va por la ruta normal.
+    digits = expr.lstrip('+-')
+    if (expr.isascii() and (expr[-1].isdigit() or expr[-1] == '.')
+            and not (len(digits) > 1 and digits[0] == '0' and digits[1].isdigit())):
+        # float() solo para literales con '.' o exponente: un entero que int()
+        # rechaza (p. ej. más de 4300 dígitos) no debe acabar como inf
+        if '.' in expr or 'e' in expr or 'E' in expr:
+            try:
+                return float(expr)
+            except ValueError:
+                return None
+        try:
+            return int(expr)
+        except ValueError:
+            return None
+    return None
+
+
 def evaluate_expression(expr):
-    # reemplezar uso de variables por sus valores en un dict seguro
-    names = {}
-    # agregar variables con sus valores numéricos
-    for k, v in variables.items():
-        names[k] = float(v) if isinstance(v, (int, float, Decimal)) else v
-    # agregar funciones
-    for k, v in MATH_FUNCS.items():
-        names[k] = v
-    names['pi'] = math.pi
-    names['e'] = math.e
+    # variables (ya en float) sobre funciones y constantes, sin copiar nada
+    names = collections.ChainMap(variables_float, _BASE_NAMES)
 
     try:
-        result = safe_eval(expr, names)
-        # si viene como float, convertir Decimal para consistencia
-        try:
-            if isinstance(result, (int, float)):
-                dres = Decimal(str(result))
-                history.append(f"{expr} => {dres}")
-                return dres
-            if isinstance(result, Decimal):
-                history.append(f"{expr} => {result}")
-                return result
-            # si la función devolvió algo distinto (como tuple), lo retornamos tal cual
-            history.append(f"{expr} => {result}")
-            return result
-        except InvalidOperation:
-            history.append(f"{expr} => {result}")
-            return result
+        result = _single_token_value(expr) if expr else None
+        if result is None and ne is not None and _array_vars:
+            result = _numexpr_eval(expr, names)
+        if result is None:
+            result = safe_eval(expr, names)
+        # solo en modo preciso se convierte a Decimal; si no, se devuelve tal cual
+        if HIGH_PRECISION and isinstance(result, (int, float)):
+            try:
+                result = _decimal_from_str(str(result))
+            except InvalidOperation:
+                pass
+        history.append(f"{expr} => {result}")
+        _set_last_result(result)
+        return result
     except Exception as e:
         return f"Error: {e}"
 
 
+def _set_last_result(result):
+    # se guarda el valor nativo; la conversión a Decimal se hace solo en M+ / M-
+    global _last_result
+    _last_result = result if isinstance(result, (int, float, Decimal)) else None
+
+
+def _clear_last_result():
+    # una asignación no deja resultado para M+ / M- (como la línea 'a = 5' del historial)
+    global _last_result
+    _last_result = None
+
+
 def handle_memory_cmd(cmd):
     global memory
     if cmd == 'MR':
@@ -277,18 +606,14 @@ def handle_memory_cmd(cmd):
         memory = Decimal('0')
         return "Memoria borrada."
     if cmd in ('M+', 'M-'):
-        # Tomar último resultado del historial
+        # Tomar último resultado guardado (sin releer el historial)
         if not history:
             return "Historial vacío, nada que almacenar."
-        last = history[-1]
-        # asumimos formato "expr => value" o "convert..."
-        if '=>' in last:
-            val_str = last.split('=>')[-1].strip()
-        else:
-            val_str = last
+        if _last_result is None:
+            return "Último resultado no es un número válido para memoria."
         try:
-            val = to_decimal(val_str)
-        except Exception:
+            val = to_decimal(_last_result)
+        except ValueError:
             return "Último resultado no es un número válido para memoria."
         if cmd == 'M+':
             memory += val
@@ -305,43 +630,99 @@ def clear_memory():
     return "Memoria limpiada."
 
 
+def toggle_precision():
+    global HIGH_PRECISION
+    HIGH_PRECISION = not HIGH_PRECISION
+    return f"Modo preciso (Decimal): {'activado' if HIGH_PRECISION else 'desactivado'}"
+
+
 def show_history():
     if not history:
         return "Historial vacío."
     out = []
-    for i, item in enumerate(history[-50:], start=1):
+    recent = itertools.islice(history, max(0, len(history) - 50), None)
+    for i, item in enumerate(recent, start=1):
         out.append(f"{i}: {item}")
     return "\n".join(out)
 
 
+@functools.lru_cache(maxsize=1)
 def help_text():
     return """
 Comandos especiales:
   help | :h        -> mostrar esta ayuda
   :history         -> mostrar historial
   :convert tipo v  -> convertir unidades (ej: :convert c_to_f 100)
+                      admite varios valores: :convert c_to_f 0, 37, 100
   :mem / :mc       -> mostrar / limpiar memoria
+  :precise         -> activar / desactivar resultados en Decimal
   M+ / M- / MR / MC -> memoria (usa el último resultado)
   exit | :q        -> salir
 
 Funciones disponibles (ejemplos):
-  sin(x), cos(x), tan(x), ln(x), log(x), sqrt(x), pow(x,y), fact(x)
+  sin(x), cos(x), tan(x), ln(x), log(x), log_base(x,b), sqrt(x), pow(x,y), fact(x)
 Constantes: pi, e
 
-Asignación: a = 3.5
+Asignación: a = 3.5   (con NumPy: v = [1, 2, 3] para operar elemento a elemento)
 Ejemplo de expresión: 2 * (3 + sin(pi/4)) - sqrt(9)
 
 Conversiones disponibles: {}
-""".format(", ".join(sorted(CONVERSIONS.keys())))
+""".format(_CONVERT_LIST_STR)
+
+
+def _quit():
+    print("Saliendo...")
+    sys.exit(0)
+
+
+def show_memory():
+    return f"Memoria = {memory}"
+
+
+# --- Comandos sin argumentos (en minúsculas) -> función que los atiende ---
+_COMMANDS = {
+    ':h': help_text, ':help': help_text, 'help': help_text, 'ayuda': help_text,
+    ':q': _quit, ':quit': _quit, 'exit': _quit, 'salir': _quit,
+    ':history': show_history, 'history': show_history,
+    ':mem': show_memory, 'memory': show_memory,
+    ':mc': clear_memory,
+    ':precise': toggle_precision,
+}
+
+
+def run_batch():
+    """
+    Modo por lotes (stdin redirigido): sin banner, prompt ni readline;
+    una línea de salida por cada resultado.
+    """
+    _write = sys.stdout.write
+    try:
+        for line in sys.stdin:
+            out = process_line(line)
+            if out is not None:
+                _write(f"{out}\n")
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Error inesperado: {e}")
 
 
 def repl():
+    if not sys.stdin.isatty():
+        run_batch()
+        return
     banner = """
 Calculadora avanzada (REPL)
 Escribe 'help' o ':h' para ver comandos.
 Ej.: 2 + 3*4, sin(pi/6), a = 3; luego a * 5
 """
+    try:
+        import readline  # noqa: F401  historial/edición en terminal
+    except ImportError:
+        pass
     print(banner)
+    # stdout queda con su buffer por defecto (por bloques si no es un terminal)
+    _write = sys.stdout.write
     try:
         while True:
             try:
@@ -356,11 +737,8 @@ Ej.: 2 + 3*4, sin(pi/6), a = 3; luego a * 5
             out = process_line(line)
             if out is None:
                 continue
-            # Mostrar salidas multilinea correctamente
-            if isinstance(out, str) and '\n' in out:
-                print(out)
-            else:
-                print(out)
+            _write(str(out))
+            _write('\n')
     except Exception as e:
         print(f"Error inesperado: {e}")
 